@@ -8,16 +8,48 @@ space in order until it finds one that's free and books it automatically.
 
 Note: This script only works with Skedda instances that use SSO authentication.
 
-Timezone: Uses pytz to handle daylight saving time automatically. Set TIMEZONE 
-env var to your timezone (default: Australia/Melbourne).
+Timezone: Uses zoneinfo (or pytz if unavailable) to handle daylight saving time 
+automatically. Set TIMEZONE env var to your timezone (default: Australia/Melbourne).
 """
 
 import os
 import sys
 import json
+import bisect
+import functools
 import requests
 import urllib.parse
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+try:
+    import ciso8601
+except ImportError:
+    ciso8601 = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def parse_iso(value):
+    # Parse an ISO 8601 timestamp, using ciso8601 when it's installed
+    if ciso8601:
+        return ciso8601.parse_datetime(value)
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+@functools.lru_cache(maxsize=1)
+def load_config_file():
+    # Read config.json once and share it between auth and spaces loading
+    try:
+        with open('config.json', 'r') as f:
+            return json.load(f)
+    except:
+        return {}
 
 class SkeddaBooker:
     def __init__(self):
@@ -25,8 +57,15 @@ class SkeddaBooker:
         self.base_url = os.getenv('SKEDDA_BASE_URL', 'https://your-instance.skedda.com')
         self.venue_id = os.getenv('SKEDDA_VENUE_ID')
         self.user_id = os.getenv('SKEDDA_USER_ID')
+        self.tz_name = os.getenv('TIMEZONE', 'Australia/Melbourne')
         self.session = requests.Session()
         
+        # Keep connections to Skedda pooled and retry transient server errors
+        retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(500, 502, 503, 504),
+                        raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+        self.session.mount(self.base_url, adapter)
+        
         if not self.venue_id or not self.user_id:
             print("missing venue_id or user_id")
             sys.exit(1)
@@ -42,6 +81,45 @@ class SkeddaBooker:
         
         self.load_spaces()
         self.load_auth()
+        
+        # Attach auth to the session once so each request doesn't re-merge it
+        self.session.headers.update(self.auth_headers)
+        requests.utils.add_dict_to_cookiejar(self.session.cookies, self.cookies)
+        
+        # Static booking payload - only start, end and spaces change per attempt
+        self.booking_template = {
+            "booking": {
+                "endOfLastOccurrence": None,
+                "title": None,
+                "price": 0,
+                "chargeTransactionId": None,
+                "invoiceId": None,
+                "lockInMargin": None,
+                "stripPrivateEventDetails": False,
+                "unrecognizedOrganizer": False,
+                "type": 1,
+                "paymentStatus": 0,
+                "recurrenceRule": None,
+                "decoupleDate": None,
+                "createdDate": None,
+                "customFields": [],
+                "piId": None,
+                "checkInAudits": None,
+                "allowInviteOthers": False,
+                "addConference": False,
+                "hideAttendees": True,
+                "availabilityStatus": 1,
+                "syncType": None,
+                "attendees": [],
+                "start": None,
+                "end": None,
+                "arbitraryerrors": None,
+                "spaces": None,
+                "venueuser": self.user_id,
+                "venue": self.venue_id,
+                "decoupleBooking": None
+            }
+        }
 
     def load_auth(self):
         # Try to get auth from env first, then config file
@@ -50,8 +128,7 @@ class SkeddaBooker:
         
         if not cookies_str:
             try:
-                with open('config.json', 'r') as f:
-                    config = json.load(f)
+                config = load_config_file()
                 cookies_str = config['SKEDDA_COOKIES']
                 token = config['SKEDDA_TOKEN']
             except:
@@ -60,6 +137,7 @@ class SkeddaBooker:
         
         self.cookies = self.parse_cookies(cookies_str)
         self.token = token.strip()
+        self.auth_headers = {**self.headers, 'x-skedda-requestverificationtoken': self.token}
 
     def parse_cookies(self, cookie_str):
         # Convert cookie string into a dict
@@ -81,12 +159,7 @@ class SkeddaBooker:
         spaces_json = os.getenv('SKEDDA_SPACES')
         
         if not spaces_json:
-            try:
-                with open('config.json', 'r') as f:
-                    config = json.load(f)
-                spaces_json = config.get('SKEDDA_SPACES')
-            except:
-                pass
+            spaces_json = load_config_file().get('SKEDDA_SPACES')
         
         if not spaces_json:
             print("missing spaces config")
@@ -104,19 +177,17 @@ class SkeddaBooker:
 
     def get_bookings(self, date):
         # Fetch all bookings for the given date
-        headers = self.headers.copy()
-        headers['x-skedda-requestverificationtoken'] = self.token
-        
         params = {
             'start': f"{date}T00:00:00",
             'end': f"{date}T23:59:59.999"
         }
         
         try:
-            r = self.session.get(f"{self.base_url}/bookingslists", headers=headers, cookies=self.cookies, params=params)
+            r = self.session.get(f"{self.base_url}/bookingslists", params=params)
             
             if r.status_code == 200:
-                return r.json().get('bookings', [])
+                data = orjson.loads(r.content) if orjson else r.json()
+                return data.get('bookings', [])
             elif r.status_code == 401:
                 self.log("auth expired")
                 return None
@@ -127,83 +198,76 @@ class SkeddaBooker:
             self.log(f"error: {e}")
             return None
 
-    def space_is_free(self, space_id, start_time, end_time, bookings):
-        # Check if a space is available during the requested time
-        target_start = datetime.fromisoformat(start_time)
-        target_end = datetime.fromisoformat(end_time)
+    def venue_timestamp(self, value):
+        # Convert an ISO time to seconds on the venue's wall clock, so the
+        # result doesn't depend on the timezone of the machine running this
+        dt = parse_iso(value)
+        if dt.tzinfo is not None:
+            dt = dt.astimezone(get_timezone(self.tz_name)).replace(tzinfo=None)
+        return dt.replace(tzinfo=timezone.utc).timestamp()
+
+    def index_bookings(self, bookings):
+        # Group booking times by space so each space check only sees its own
+        intervals = defaultdict(list)
         
         for booking in bookings:
             # Handle different space data formats
             spaces = booking.get('spaces', [])
             if isinstance(spaces, str):
                 spaces = [spaces]
+            else:
+                spaces = list(spaces)
             if booking.get('space'):
                 spaces.append(booking['space'])
             
-            if str(space_id) in [str(s) for s in spaces]:
-                try:
-                    start_str = booking.get('start', '')
-                    end_str = booking.get('end', '')
-                    
-                    # Handle timezone formats
-                    if start_str.endswith('Z'):
-                        booking_start = datetime.fromisoformat(start_str.replace('Z', '+00:00'))
-                        booking_end = datetime.fromisoformat(end_str.replace('Z', '+00:00'))
-                    else:
-                        booking_start = datetime.fromisoformat(start_str)
-                        booking_end = datetime.fromisoformat(end_str)
-                    
-                    # Check for time overlap
-                    if target_start < booking_end and target_end > booking_start:
-                        return False
-                except:
-                    continue
+            try:
+                booking_start = self.venue_timestamp(booking.get('start', ''))
+                booking_end = self.venue_timestamp(booking.get('end', ''))
+            except:
+                continue
+            
+            for s in spaces:
+                intervals[str(s)].append((booking_start, booking_end))
+        
+        # Sort each space's bookings by start time and track the latest end
+        # seen so far, so overlap checks can bisect instead of scanning
+        index = {}
+        for space_id, times in intervals.items():
+            times.sort()
+            starts = []
+            max_ends = []
+            latest_end = float('-inf')
+            for booking_start, booking_end in times:
+                latest_end = max(latest_end, booking_end)
+                starts.append(booking_start)
+                max_ends.append(latest_end)
+            index[space_id] = (starts, max_ends)
         
-        return True
+        return index
+
+    def space_is_free(self, space_id, target_start, target_end, index):
+        # Check if a space is available during the requested time
+        if str(space_id) not in index:
+            return True
+        
+        starts, max_ends = index[str(space_id)]
+        
+        # Bookings before i start before the target ends; any of them
+        # overlapping means the latest end among them is after the target start
+        i = bisect.bisect_left(starts, target_end)
+        return i == 0 or max_ends[i - 1] <= target_start
 
     def book_space(self, space_id, start_time, end_time):
         # Submit a booking request for the space
-        headers = self.headers.copy()
-        headers['x-skedda-requestverificationtoken'] = self.token
-        
-        # Build the booking payload
-        data = {
-            "booking": {
-                "endOfLastOccurrence": None,
-                "title": None,
-                "price": 0,
-                "chargeTransactionId": None,
-                "invoiceId": None,
-                "lockInMargin": None,
-                "stripPrivateEventDetails": False,
-                "unrecognizedOrganizer": False,
-                "type": 1,
-                "paymentStatus": 0,
-                "recurrenceRule": None,
-                "decoupleDate": None,
-                "createdDate": None,
-                "customFields": [],
-                "piId": None,
-                "checkInAudits": None,
-                "allowInviteOthers": False,
-                "addConference": False,
-                "hideAttendees": True,
-                "availabilityStatus": 1,
-                "syncType": None,
-                "attendees": [],
-                "start": start_time,
-                "end": end_time,
-                "arbitraryerrors": None,
-                "spaces": [space_id],
-                "venueuser": self.user_id,
-                "venue": self.venue_id,
-                "decoupleBooking": None
-            }
-        }
+        # Fill in the booking template
+        booking = self.booking_template["booking"]
+        booking["start"] = start_time
+        booking["end"] = end_time
+        booking["spaces"] = [space_id]
+        body = orjson.dumps(self.booking_template) if orjson else json.dumps(self.booking_template)
         
         try:
-            r = self.session.post(f"{self.base_url}/bookings",
-                                headers=headers, cookies=self.cookies, json=data)
+            r = self.session.post(f"{self.base_url}/bookings", data=body)
             
             if r.status_code == 200:
                 return space_id
@@ -235,11 +299,16 @@ class SkeddaBooker:
             
         self.log(f"{len(bookings)} bookings found")
         
+        # Parse the target times and index bookings once for all spaces
+        target_start = self.venue_timestamp(start_dt)
+        target_end = self.venue_timestamp(end_dt)
+        index = self.index_bookings(bookings)
+        
         # Try each space in order
         for i, (space_id, space_name) in enumerate(self.spaces.items()):
             self.log(f"trying {space_name} ({i+1}/{len(self.spaces)})")
             
-            if self.space_is_free(space_id, start_dt, end_dt, bookings):
+            if self.space_is_free(space_id, target_start, target_end, index):
                 self.log(f"booking {space_name}...")
                 result = self.book_space(space_id, start_dt, end_dt)
                 if result:
@@ -253,6 +322,18 @@ class SkeddaBooker:
         self.log("no spaces available")
         return False, f"all {len(self.spaces)} spaces taken"
 
+@functools.lru_cache(maxsize=None)
+def get_timezone(name):
+    # Look up a timezone once, preferring stdlib zoneinfo over pytz
+    if name.upper() == 'UTC':
+        return timezone.utc
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except (ImportError, KeyError):
+        import pytz
+        return pytz.timezone(name)
+
 def setup():
     # Create a template config file for local use
     config = {
@@ -282,14 +363,12 @@ def main():
     days_ahead = int(os.getenv('DAYS_AHEAD', '14'))
     
     # Timezone for date calculations (handles daylight saving automatically)
-    timezone = os.getenv('TIMEZONE', 'Australia/Melbourne')
+    tz_name = os.getenv('TIMEZONE', 'Australia/Melbourne')
     
     # Calculate target date
     try:
-        import pytz
-        tz = pytz.timezone(timezone)
-        now = datetime.now(tz)
-        target = now + timedelta(days=days_ahead)
+        tz = get_timezone(tz_name)
+        target = datetime.now(tz) + timedelta(days=days_ahead)
         date_str = target.strftime("%Y-%m-%d")
         print(f"booking for {target.strftime('%a %d %b')}")
     except ImportError: